@@ -1,10 +1,13 @@
 # app.py
 import streamlit as st
 import pandas as pd
+# Plotly's "auto" JSON engine (used by st.plotly_chart) switches to orjson once it is installed
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
+import glob
+import hashlib
+import os
 
 # ------------------- Page Config -------------------
 st.set_page_config(
@@ -15,68 +18,180 @@ st.set_page_config(
 )
 
 # ------------------- Load & Clean Data -------------------
-@st.cache_data
-def load_data():
-    df = pd.read_csv("budget.csv")
+CSV_PATH = "budget.csv"
+# Bump whenever the cleaning in _ensure_parquet changes what gets written, so old files are not reused
+SCHEMA_VERSION = 2
+NUMERIC_COLS = ['Revenue (Plan)', 'Capital (Plan)', 'Total (Plan)',
+                'Revenue (Non-Plan)', 'Capital (Non-Plan)', 'Total (Non-Plan)', 'Total Plan & Non-Plan']
+
+# Top ministries to focus on
+focus_ministries = [
+    "MINISTRY OF DEFENCE",
+    "MINISTRY OF FINANCE",
+    "MINISTRY OF HOME AFFAIRS",
+    "MINISTRY OF AGRICULTURE AND FARMERS' WELFARE",
+    "MINISTRY OF HEALTH AND FAMILY WELFARE"
+]
+
+# Display labels, e.g. "MINISTRY OF HOME AFFAIRS" → "Home Affairs"
+SHORT = dict(zip(focus_ministries, [m.replace("MINISTRY OF ", "").title() for m in focus_ministries]))
+
+# Ministry names that changed over the years, mapped to a single spelling
+RENAME = {
+    "MINISTRY OF AGRICULTURE AND FARMERS WELFARE": "MINISTRY OF AGRICULTURE AND FARMERS' WELFARE",
+    "MINISTRY OF AGRICULTURE": "MINISTRY OF AGRICULTURE AND FARMERS' WELFARE"
+}
+
+# The Parquet file holds cleaned, focus-only rows, so its name covers every input that shapes it
+DATA_KEY = hashlib.sha1(repr((SCHEMA_VERSION, focus_ministries, RENAME)).encode()).hexdigest()[:12]
+PARQUET_PATH = f"budget.{DATA_KEY}.parquet"
+
+def _ensure_parquet():
+    # Clean the CSV once and keep the result as Parquet; rebuild if the CSV is newer or the schema changed
+    if os.path.exists(PARQUET_PATH) and os.path.getmtime(CSV_PATH) <= os.path.getmtime(PARQUET_PATH):
+        return
+
+    # The C parser strips thousands separators and maps "-" to NaN while tokenizing.
+    # Amounts are in crores and only shown to a few significant figures, so float32 is plenty.
+    df = pd.read_csv(CSV_PATH, engine="c", usecols=["Ministry Name", "Year"] + NUMERIC_COLS,
+                     thousands=",", na_values=["-"], dtype={c: np.float32 for c in NUMERIC_COLS})
     
     # Clean and standardize ministry names
-    df["Ministry Name"] = df["Ministry Name"].replace({
-        "MINISTRY OF AGRICULTURE AND FARMERS WELFARE": "MINISTRY OF AGRICULTURE AND FARMERS' WELFARE",
-        "MINISTRY OF AGRICULTURE": "MINISTRY OF AGRICULTURE AND FARMERS' WELFARE"
-    })
-    
-    # Fill missing total with sum where possible
-    numeric_cols = ['Revenue (Plan)', 'Capital (Plan)', 'Total (Plan)',
-                    'Revenue (Non-Plan)', 'Capital (Non-Plan)', 'Total (Non-Plan)', 'Total Plan & Non-Plan']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col].replace({',': '', '-': np.nan}), errors='coerce')
+    df["Ministry Name"] = df["Ministry Name"].map(RENAME).fillna(df["Ministry Name"])
+
+    # Only the focus ministries are ever used; drop the rest before any further work
+    df = df[df["Ministry Name"].isin(focus_ministries)].copy()
     
     # Use Total Plan & Non-Plan first, then Total (Plan), then sum
     df["Total Allocation"] = df["Total Plan & Non-Plan"].fillna(df["Total (Plan)"])
     
     # For years after 2017, only Plan exists → already filled
     df["Year"] = df["Year"].str[:9]  # Clean year format
-    return df
 
-df = load_data()
+    # Few distinct values repeated on every row → categorical codes for cheap groupby/isin
+    df["Ministry Name"] = df["Ministry Name"].astype("category")
+    years_sorted = sorted(df["Year"].unique())
+    df["Year"] = pd.Categorical(df["Year"], categories=years_sorted, ordered=True)
+    df["Ministry Short"] = df["Ministry Name"].str.replace("MINISTRY OF ", "", regex=False).str.title().astype("category")
+    df.to_parquet(PARQUET_PATH, engine="pyarrow", compression="zstd")
 
-# Top ministries to focus on
-focus_ministries = [
-    "MINISTRY OF DEFENCE",
-    "MINISTRY OF FINANCE",
-    "MINISTRY OF HOME AFFAIRS",
-    "MINISTRY OF AGRICULTURE AND FARMERS' WELFARE",
-    "MINISTRY OF HEALTH AND FAMILY WELFARE"
-]
+    # Files written for an older schema or older constants are never read again
+    for stale in glob.glob("budget*.parquet"):
+        if stale != PARQUET_PATH:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+# Cache key for everything derived from the data: CSV edits and cleaning changes both invalidate it.
+# max_entries below keep roughly two tokens' worth of entries so superseded data gets evicted.
+DATA_TOKEN = (os.path.getmtime(CSV_PATH), DATA_KEY)
 
-df_focus = df[df["Ministry Name"].isin(focus_ministries)].copy()
+@st.cache_data(persist="disk", show_spinner=False, max_entries=2)
+def load_data(csv_mtime, data_key):
+    # Arguments only key the cache; the Parquet path already encodes data_key
+    _ensure_parquet()
+    return pd.read_parquet(PARQUET_PATH)
 
-# Calculate yearly total budget
-yearly_total = df_focus.groupby("Year")["Total Allocation"].sum().reset_index()
-yearly_total = yearly_total.sort_values("Year")
+@st.cache_data(show_spinner=False, max_entries=2)
+def build_focus(csv_mtime, data_key):
+    df_focus = load_data(csv_mtime, data_key)
 
-# Merge to get % share
-df_focus = df_focus.merge(yearly_total, on="Year", suffixes=('', '_total'))
-df_focus["% of Total Budget"] = (df_focus["Total Allocation"] / df_focus["Total Allocation_total"]) * 100
+    # % share of each year's total, broadcast back onto the rows without a merge
+    yearly_total = df_focus.groupby("Year", observed=True)["Total Allocation"].transform("sum")
+    df_focus["% of Total Budget"] = 100 * df_focus["Total Allocation"] / yearly_total
+    return df_focus
+
+# Index the focus rows once so scalar lookups are hash hits instead of mask scans.
+# cache_resource hands back the same frame each call; callers only read from it.
+@st.cache_resource(show_spinner=False, max_entries=2)
+def focus_index(csv_mtime, data_key):
+    return build_focus(csv_mtime, data_key).set_index(["Ministry Name", "Year"])
+
+df_focus = build_focus(*DATA_TOKEN)
+df_focus_idx = focus_index(*DATA_TOKEN)
 
 # Indian Rupee formatting
+def inr_vec(a):
+    # Vectorized over an array of crore amounts; one NumPy pass instead of per-value branching
+    a = np.asarray(a, dtype=np.float64)
+    return np.select(
+        [a >= 100000, a >= 1000],
+        [np.char.mod("₹%.1f Lakh Cr", a / 100000), np.char.mod("₹%.0f Thousand Cr", a / 1000)],
+        default=np.char.mod("₹%.0f Cr", a)
+    )
+
 def inr(x):
-    if x >= 100000:
-        return f"₹{x/100000:.1f} Lakh Cr"
-    elif x >= 1000:
-        return f"₹{x/1000:.0f} Thousand Cr"
-    else:
-        return f"₹{x:.0f} Cr"
+    return str(inr_vec([x])[0])
+
+# ------------------- Cached Figures -------------------
+# Builders are keyed on DATA_TOKEN plus the selection; the data itself is never hashed per rerun
+# Sankey structure is fixed by focus_ministries; only the link values change per year
+SANKEY_NODE_STYLE = dict(pad=15, thickness=20, line=dict(color="black", width=0.5))
+SANKEY_LABELS = ["Total Budget"] + [SHORT[m] for m in focus_ministries]
+SANKEY_COLORS = ["#636EFA"] + px.colors.qualitative.Plotly[:len(focus_ministries)]
+SANKEY_SOURCE = [0] * len(focus_ministries)
+SANKEY_TARGET = list(range(1, len(focus_ministries) + 1))
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def make_sankey(data_token, year):
+    df_focus_idx = focus_index(*data_token)
+    allocations = [df_focus_idx.at[(m, year), "Total Allocation"] for m in focus_ministries]
+
+    fig = go.Figure(data=[go.Sankey(
+        node=dict(SANKEY_NODE_STYLE, label=SANKEY_LABELS, color=SANKEY_COLORS),
+        link=dict(source=SANKEY_SOURCE, target=SANKEY_TARGET, value=allocations)
+    )])
+    fig.update_layout(height=600, font_size=12)
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def make_trend_fig(data_token):
+    # Absolute
+    fig = px.line(build_focus(*data_token), x="Year", y="Total Allocation", color="Ministry Short",
+                  markers=True, render_mode="webgl", labels={"Ministry Short": "Ministry"},
+                  category_orders={"Ministry Short": list(SHORT.values())})
+
+    fig.update_layout(
+        title="Absolute Allocation (in Crore ₹)",
+        xaxis_title="Year",
+        yaxis_title="Amount (₹ Crore)",
+        height=600,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def make_area_fig(data_token):
+    fig = px.area(build_focus(*data_token), x="Year", y="% of Total Budget", color="Ministry Name",
+                  title="Share of Total Union Budget Over Time",
+                  color_discrete_sequence=px.colors.qualitative.Bold)
+    fig.update_layout(height=600, legend_title="Ministry")
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=10)
+def make_deep_dive(data_token, ministry):
+    df_focus = build_focus(*data_token)
+    data = df_focus[df_focus["Ministry Name"] == ministry]
+
+    bar = px.bar(data, x="Year", y="Total Allocation", title="Total Allocation Over Time")
+    bar.update_yaxes(title="₹ Crore")
+
+    line = px.line(data, x="Year", y="% of Total Budget", title="% Share of Total Budget", markers=True,
+                   render_mode="webgl")
+    line.update_yaxes(title="% of Total Budget")
+    return bar, line
+
 
 # ------------------- Sidebar -------------------
 st.sidebar.title("India Budget Explorer")
 st.sidebar.markdown("### 2014 → 2025")
-year_selected = st.sidebar.selectbox("Select Year", sorted(df_focus["Year"].unique()))
+year_selected = st.sidebar.selectbox("Select Year", list(df_focus["Year"].cat.categories))
 
 ministry_selected = st.sidebar.selectbox(
     "Deep Dive into Ministry",
     options=focus_ministries,
-    format_func=lambda x: x.replace("MINISTRY OF ", "").title()
+    format_func=SHORT.__getitem__
 )
 
 # ------------------- Header -------------------
@@ -89,12 +204,12 @@ Explore the dramatic reordering of national priorities.
 # ------------------- Key Insight Cards -------------------
 col1, col2, col3, col4 = st.columns(4)
 
-defence_2014 = df_focus[(df_focus["Ministry Name"] == "MINISTRY OF DEFENCE") & (df_focus["Year"] == "2014-2015")]["Total Allocation"].iloc[0]
-defence_2024 = df_focus[(df_focus["Ministry Name"] == "MINISTRY OF DEFENCE") & (df_focus["Year"] == "2024-2025")]["Total Allocation"].iloc[0]
+defence_2014 = df_focus_idx.at[("MINISTRY OF DEFENCE", "2014-2015"), "Total Allocation"]
+defence_2024 = df_focus_idx.at[("MINISTRY OF DEFENCE", "2024-2025"), "Total Allocation"]
 defence_growth = (defence_2024 / defence_2014)
 
-agri_share_2014 = df_focus[(df_focus["Ministry Name"] == "MINISTRY OF AGRICULTURE AND FARMERS' WELFARE") & (df_focus["Year"] == "2014-2015")]["% of Total Budget"].iloc[0]
-agri_share_2024 = df_focus[(df_focus["Ministry Name"] == "MINISTRY OF AGRICULTURE AND FARMERS' WELFARE") & (df_focus["Year"] == "2024-2025")]["% of Total Budget"].iloc[0]
+agri_share_2014 = df_focus_idx.at[("MINISTRY OF AGRICULTURE AND FARMERS' WELFARE", "2014-2015"), "% of Total Budget"]
+agri_share_2024 = df_focus_idx.at[("MINISTRY OF AGRICULTURE AND FARMERS' WELFARE", "2024-2025"), "% of Total Budget"]
 
 with col1:
     st.metric("Defence Budget Growth", f"{defence_growth:.1f}x", "2014 → 2025")
@@ -105,92 +220,49 @@ with col3:
 with col4:
     st.metric("Agri Share 2024", f"{agri_share_2024:.2f}%", f"-{agri_share_2014 - agri_share_2024:.1f} pp")
 
-# ------------------- Sankey Diagram (2014 vs 2024) -------------------
-st.markdown("## The Great Reallocation: 2014 vs 2024")
-
-col1, col2 = st.columns(2)
+# ------------------- Charts -------------------
+# Illustrative charts nobody zooms or hovers; skip Plotly.js interaction handling for them
+STATIC_CHART = {"staticPlot": True, "displayModeBar": False}
 
-with col1:
-    st.markdown("### 2014–2015")
-    df_2014 = df_focus[df_focus["Year"] == "2014-2015"]
-    fig1 = go.Figure(data=[go.Sankey(
-        node = dict(
-            pad = 15, thickness = 20, line = dict(color = "black", width = 0.5),
-            label = ["Total Budget"] + df_2014["Ministry Name"].str.replace("MINISTRY OF ", "").str.title().tolist(),
-            color = ["#636EFA"] + px.colors.qualitative.Plotly[:len(df_2014)]
-        ),
-        link = dict(
-            source = [0] * len(df_2014),
-            target = list(range(1, len(df_2014)+1)),
-            value = df_2014["Total Allocation"].tolist()
-        ))])
-    fig1.update_layout(height=600, font_size=12)
-    st.plotly_chart(fig1, use_container_width=True)
+# Tabs rerun on switch and report which one is open, so hidden tabs skip building their figures
+tab_realloc, tab_trends, tab_deep = st.tabs(["Reallocation", "Trends", "Deep Dive"],
+                                            key="active_tab", on_change="rerun")
 
-with col2:
-    st.markdown("### 2024–2025")
-    df_2024 = df_focus[df_focus["Year"] == "2024-2025"]
-    fig2 = go.Figure(data=[go.Sankey(
-        node = dict(
-            pad = 15, thickness = 20, line = dict(color = "black", width = 0.5),
-            label = ["Total Budget"] + df_2024["Ministry Name"].str.replace("MINISTRY OF ", "").str.title().tolist(),
-            color = ["#636EFA"] + px.colors.qualitative.Plotly[:len(df_2024)]
-        ),
-        link = dict(
-            source = [0] * len(df_2024),
-            target = list(range(1, len(df_2024)+1)),
-            value = df_2024["Total Allocation"].tolist()
-        ))])
-    fig2.update_layout(height=600, font_size=12)
-    st.plotly_chart(fig2, use_container_width=True)
+# ------------------- Sankey Diagram (2014 vs 2024) -------------------
+with tab_realloc:
+    if tab_realloc.open:
+        st.markdown("## The Great Reallocation: 2014 vs 2024")
 
-# ------------------- Trend Lines -------------------
-st.markdown("## Budget Allocation Over Time")
+        col1, col2 = st.columns(2)
 
-fig = make_subplots(specs=[[{"secondary_y": True}]])
+        for col, year in ((col1, "2014-2015"), (col2, "2024-2025")):
+            with col:
+                st.markdown(f"### {year.replace('-', '–')}")
+                st.plotly_chart(make_sankey(DATA_TOKEN, year), width="stretch", config=STATIC_CHART)
 
-# Absolute
-for ministry in focus_ministries:
-    data = df_focus[df_focus["Ministry Name"] == ministry]
-    fig.add_trace(go.Scatter(
-        x=data["Year"], y=data["Total Allocation"],
-        name=ministry.replace("MINISTRY OF ", "").title(),
-        mode='lines+markers'
-    ), secondary_y=False)
-
-fig.update_layout(
-    title="Absolute Allocation (in Crore ₹)",
-    xaxis_title="Year",
-    yaxis_title="Amount (₹ Crore)",
-    height=600,
-    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-)
-fig.update_yaxes(title_text="Amount (₹ Crore)", secondary_y=False)
-st.plotly_chart(fig, use_container_width=True)
+# ------------------- Trend Lines -------------------
+with tab_trends:
+    if tab_trends.open:
+        st.markdown("## Budget Allocation Over Time")
+        st.plotly_chart(make_trend_fig(DATA_TOKEN), width="stretch")
 
-# Percentage share
-st.markdown("### Real Story: % Share of Total Budget")
-fig2 = px.area(df_focus, x="Year", y="% of Total Budget", color="Ministry Name",
-               title="Share of Total Union Budget Over Time",
-               color_discrete_sequence=px.colors.qualitative.Bold)
-fig2.update_layout(height=600, legend_title="Ministry")
-st.plotly_chart(fig2, use_container_width=True)
+        # Percentage share
+        st.markdown("### Real Story: % Share of Total Budget")
+        st.plotly_chart(make_area_fig(DATA_TOKEN), width="stretch", config=STATIC_CHART)
 
 # ------------------- Ministry Deep Dive -------------------
-st.markdown(f"## Deep Dive: {ministry_selected.replace('MINISTRY OF ', '').title()}")
+with tab_deep:
+    if tab_deep.open:
+        st.markdown(f"## Deep Dive: {SHORT[ministry_selected]}")
 
-data = df_focus[df_focus["Ministry Name"] == ministry_selected]
+        bar_fig, line_fig = make_deep_dive(DATA_TOKEN, ministry_selected)
 
-col1, col2 = st.columns(2)
-with col1:
-    fig = px.bar(data, x="Year", y="Total Allocation", title="Total Allocation Over Time")
-    fig.update_yaxes(title="₹ Crore")
-    st.plotly_chart(fig, use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(bar_fig, width="stretch")
 
-with col2:
-    fig = px.line(data, x="Year", y="% of Total Budget", title="% Share of Total Budget", markers=True)
-    fig.update_yaxes(title="% of Total Budget")
-    st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            st.plotly_chart(line_fig, width="stretch")
 
 # ------------------- Fun Comparisons -------------------
 st.markdown("## What Could This Money Buy?")